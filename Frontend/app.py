@@ -2,6 +2,9 @@ import streamlit as st
 import requests
 from datetime import time as dt_time
 import re
+import time
+import threading
+from cachetools import TTLCache
 
 API_URL = "https://your-fastapi-app.up.railway.app"
 
@@ -47,8 +50,74 @@ def set_bg():
 set_bg()
 
 # ------------------ Gmail Validation ------------------
+GMAIL_RE = re.compile(r"[a-zA-Z0-9_.+-]+@gmail\.com")
+
 def is_valid_gmail(email):
-    return re.match(r"^[a-zA-Z0-9_.+-]+@gmail\.com$", email)
+    return GMAIL_RE.fullmatch(email) is not None
+
+# ------------------ API Helpers ------------------
+@st.cache_resource
+def http():
+    return requests.Session()
+
+@st.cache_resource
+def etag_store():
+    # Shared by every session, so keep it bounded and lock it against concurrent reruns
+    return TTLCache(maxsize=1000, ttl=300), threading.Lock()
+
+def conditional_get(path, token=None):
+    # Revalidate with If-None-Match and reuse the last body when the server answers 304
+    store, lock = etag_store()
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    key = (path, token)
+    with lock:
+        cached = store.get(key)
+    if cached:
+        headers["If-None-Match"] = cached[0]
+    r = http().get(f"{API_URL}{path}", headers=headers)
+    if r.status_code == 304 and cached:
+        return cached[1]
+    r.raise_for_status()
+    data = r.json()
+    if r.headers.get("ETag"):
+        with lock:
+            store[key] = (r.headers["ETag"], data)
+    return data
+
+def forget_etags(token):
+    store, lock = etag_store()
+    with lock:
+        store.pop(("/appointments", token), None)
+
+DOCTORS_TTL = 60
+APPOINTMENTS_TTL = 15
+
+@st.cache_data(ttl=DOCTORS_TTL)
+def fetch_doctors():
+    return conditional_get("/doctors")
+
+@st.cache_data(ttl=APPOINTMENTS_TTL)
+def fetch_appointments(token):
+    return conditional_get("/appointments", token)
+
+def fetch_bootstrap(token):
+    headers = {"Authorization": f"Bearer {token}"}
+    r = http().get(f"{API_URL}/bootstrap", headers=headers)
+    r.raise_for_status()
+    return r.json()
+
+def error_detail(res, default):
+    # Validation errors (422) carry a list of error dicts instead of a message
+    detail = res.json().get("detail", default)
+    if isinstance(detail, list) and detail:
+        return detail[0].get("msg", default)
+    return detail
+
+def from_bootstrap(section, ttl):
+    # Serve the login-time payload only while it is as fresh as the matching fetch_* cache
+    if st.session_state.bootstrap and time.monotonic() - st.session_state.bootstrap_at < ttl:
+        return st.session_state.bootstrap[section]
+    return None
 
 # ------------------ Header and Logo ------------------
 st.write("🩺 Book your doctor visits easily with this app.")
@@ -63,24 +132,109 @@ if "role" not in st.session_state:
     st.session_state.role = None
 if "user_id" not in st.session_state:
     st.session_state.user_id = None
+if "bootstrap" not in st.session_state:
+    st.session_state.bootstrap = None
+    st.session_state.bootstrap_at = 0.0
 
 # ------------------ Sidebar Menu ------------------
-if st.session_state.role == "patient":
-    menu = ["Home", "Signup", "Login", "Doctors", "My Appointments"]
-elif st.session_state.role == "doctor":
-    menu = ["Home", "Signup", "Login", "My Appointments"]
-else:
-    menu = ["Home", "Signup", "Login"]
+MENUS = {
+    "patient": ("Home", "Signup", "Login", "Doctors", "My Appointments"),
+    "doctor": ("Home", "Signup", "Login", "My Appointments"),
+    None: ("Home", "Signup", "Login"),
+}
+
+menu = MENUS.get(st.session_state.role, MENUS[None])
 
 choice = st.sidebar.selectbox("Menu", menu)
 
 if st.session_state.token:
     if st.sidebar.button("Logout"):
+        forget_etags(st.session_state.token)
+        fetch_appointments.clear(st.session_state.token)
         st.session_state.token = None
         st.session_state.role = None
         st.session_state.user_id = None
+        st.session_state.bootstrap = None
         st.success("Logged out successfully.")
 
+# ------------------ Page Fragments ------------------
+@st.fragment
+def render_doctor(doc):
+    st.markdown(f"### {doc['name']}")
+    st.write(f"**Specialty:** {doc.get('specialty', 'N/A')}")
+    st.write(f"**Fees:** ₹{doc.get('fees', 'N/A')}")
+    with st.form(key=f"book_form_{doc['id']}"):
+        date = st.date_input(f"Select date for {doc['name']}", key=f"date_{doc['id']}")
+        appointment_time = st.time_input(f"Select time for {doc['name']}", key=f"time_{doc['id']}", value=dt_time(9, 0))
+        submitted = st.form_submit_button(f"Book with {doc['name']}")
+
+    if submitted:
+        payload = {
+            "doctor_id": doc["id"],
+            "date": str(date),
+            "time": appointment_time.strftime("%H:%M")
+        }
+        headers = {"Authorization": f"Bearer {st.session_state.token}"}
+        try:
+            res = http().post(f"{API_URL}/appointments", json=payload, headers=headers)
+            if res.status_code == 200:
+                fetch_appointments.clear()
+                st.session_state.bootstrap = None
+                st.success(res.json().get("message", "Appointment booked!"))
+            else:
+                st.error(error_detail(res, "Booking failed"))
+        except Exception as e:
+            st.error(f"Error: {e}")
+    st.markdown("---")
+
+@st.fragment
+def render_appt(appt):
+    if st.session_state.role == "doctor":
+        st.write(f"Appointment with Patient: {appt['patient_name']} | Date: {appt['date']} | Time: {appt.get('time', 'Not set')} | Status: {appt['status']}")
+
+        if appt['status'] == "pending":
+            with st.form(key=f"update_form_{appt['id']}"):
+                new_status = st.selectbox(
+                    f"Change status for appointment {appt['id']}",
+                    ["pending", "accepted", "rejected"],
+                    index=0,
+                    key=f"status_{appt['id']}"
+                )
+                new_time = st.time_input(
+                    f"Set time for appointment {appt['id']}",
+                    key=f"time_{appt['id']}",
+                    value=dt_time(9, 0)
+                )
+                submitted = st.form_submit_button(f"Update Appointment {appt['id']}")
+
+            if submitted:
+                payload = {
+                    "status": new_status,
+                    "time": new_time.strftime("%H:%M")
+                }
+                headers = {"Authorization": f"Bearer {st.session_state.token}"}
+                try:
+                    res = http().put(
+                        f"{API_URL}/appointments/{appt['id']}",
+                        json=payload,
+                        headers=headers
+                    )
+                    if res.status_code == 200:
+                        fetch_appointments.clear()
+                        st.session_state.bootstrap = None
+                        # rerun the whole page so the list is refetched; the message survives via session state
+                        st.session_state.flash = "Appointment updated successfully!"
+                        st.rerun(scope="app")
+                    else:
+                        st.error(f"Failed to update: {error_detail(res, 'Error')}")
+                except Exception as e:
+                    st.error(f"Error: {e}")
+
+    elif st.session_state.role == "patient":
+        st.write(f"Appointment with Doctor: {appt['doctor_name']} | Date: {appt['date']} | Time: {appt.get('time', 'Not set')} | Status: {appt['status']}")
+
+    st.markdown("---")
+
 # ------------------ Home Page ------------------
 if choice == "Home":
     st.title("🏥 Doctor Appointment Booking")
@@ -115,11 +269,11 @@ elif choice == "Signup":
             }
 
             try:
-                r = requests.post(f"{API_URL}/signup", json=payload)
+                r = http().post(f"{API_URL}/signup", json=payload)
                 if r.status_code == 200:
                     st.success(r.json().get("message", "Signup successful!"))
                 else:
-                    st.error(r.json().get("detail", "Signup failed"))
+                    st.error(error_detail(r, "Signup failed"))
             except Exception as e:
                 st.error(f"Error: {e}")
 
@@ -131,15 +285,21 @@ elif choice == "Login":
 
     if st.button("Login"):
         try:
-            r = requests.post(f"{API_URL}/login", json={"email": email, "password": password})
+            r = http().post(f"{API_URL}/login", json={"email": email, "password": password})
             if r.status_code == 200:
                 data = r.json()
                 st.session_state.token = data.get("access_token")
                 st.session_state.role = data.get("role")
                 st.session_state.user_id = data.get("id")
                 st.success("Logged in successfully!")
+                try:
+                    st.session_state.bootstrap = fetch_bootstrap(st.session_state.token)
+                    st.session_state.bootstrap_at = time.monotonic()
+                except Exception:
+                    # the pages fall back to fetching their own data
+                    st.session_state.bootstrap = None
             else:
-                st.error(r.json().get("detail", "Invalid credentials"))
+                st.error(error_detail(r, "Invalid credentials"))
         except Exception as e:
             st.error(f"Error: {e}")
 
@@ -150,32 +310,18 @@ elif choice == "Doctors":
     else:
         st.subheader("Available Doctors")
         try:
-            r = requests.get(f"{API_URL}/doctors")
-            if r.status_code == 200:
-                for doc in r.json():
-                    st.markdown(f"### {doc['name']}")
-                    st.write(f"**Specialty:** {doc.get('specialty', 'N/A')}")
-                    st.write(f"**Fees:** ₹{doc.get('fees', 'N/A')}")
-                    date = st.date_input(f"Select date for {doc['name']}", key=f"date_{doc['id']}")
-                    appointment_time = st.time_input(f"Select time for {doc['name']}", key=f"time_{doc['id']}", value=dt_time(9, 0))
-
-                    if st.button(f"Book with {doc['name']}", key=f"book_{doc['id']}"):
-                        payload = {
-                            "doctor_id": doc["id"],
-                            "date": str(date),
-                            "time": appointment_time.strftime("%H:%M")
-                        }
-                        headers = {"Authorization": f"Bearer {st.session_state.token}"}
-                        res = requests.post(f"{API_URL}/appointments", json=payload, headers=headers)
-                        if res.status_code == 200:
-                            st.success(res.json().get("message", "Appointment booked!"))
-                        else:
-                            st.error(res.json().get("detail", "Booking failed"))
-                    st.markdown("---")
-            else:
-                st.error("Failed to fetch doctors list.")
+            doctors = from_bootstrap("doctors", DOCTORS_TTL)
+            if doctors is None:
+                doctors = fetch_doctors()
+        except requests.HTTPError:
+            st.error("Failed to fetch doctors list.")
+            doctors = []
         except Exception as e:
             st.error(f"Error: {e}")
+            doctors = []
+
+        for doc in doctors:
+            render_doctor(doc)
 
 # ------------------ My Appointments Page ------------------
 elif choice == "My Appointments":
@@ -183,49 +329,14 @@ elif choice == "My Appointments":
         st.error("Please login first.")
     else:
         st.subheader("My Appointments")
+        flash = st.session_state.pop("flash", None)
+        if flash:
+            st.success(flash)
         try:
-            r = requests.get("http://example.com/api")
-            headers = {"Authorization": f"Bearer {st.session_state.token}"}
-            r = requests.get(f"{API_URL}/appointments", headers=headers)
-            if r.status_code == 200:
-                appointments = r.json()
-                if appointments:
-                    for appt in appointments:
-                        if st.session_state.role == "doctor":
-                            st.write(f"Appointment with Patient: {appt['patient_name']} | Date: {appt['date']} | Time: {appt.get('time', 'Not set')} | Status: {appt['status']}")
-                            
-                            if appt['status'] == "pending":
-                                new_status = st.selectbox(
-                                    f"Change status for appointment {appt['id']}",
-                                    ["pending", "accepted", "rejected"],
-                                    index=0,
-                                    key=f"status_{appt['id']}"
-                                )
-                                new_time = st.time_input(
-                                    f"Set time for appointment {appt['id']}",
-                                    key=f"time_{appt['id']}",
-                                    value=dt_time(9, 0)
-                                )
-
-                                if st.button(f"Update Appointment {appt['id']}", key=f"update_{appt['id']}"):
-                                    payload = {
-                                        "status": new_status,
-                                        "time": new_time.strftime("%H:%M")
-                                    }
-                                    res = requests.put(
-                                        f"{API_URL}/appointments/{appt['id']}",
-                                        json=payload,
-                                        headers=headers
-                                    )
-                                    if res.status_code == 200:
-                                        st.success("Appointment updated successfully!")
-                                    else:
-                                        st.error(f"Failed to update: {res.json().get('detail', 'Error')}")
-                        
-                        elif st.session_state.role == "patient":
-                            st.write(f"Appointment with Doctor: {appt['doctor_name']} | Date: {appt['date']} | Time: {appt.get('time', 'Not set')} | Status: {appt['status']}")
-                        
-                        st.markdown("---")
+            appointments = from_bootstrap("appointments", APPOINTMENTS_TTL)
+            if appointments is None:
+                appointments = fetch_appointments(st.session_state.token)
+            for appt in appointments:
+                render_appt(appt)
         except Exception as e:
             st.error(f"Error: {e}")
-
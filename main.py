@@ -1,26 +1,66 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, Date, Time
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship, Session
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Time, select, event, exists, make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateTable, CreateIndex
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import declarative_base, relationship
 from passlib.context import CryptContext
-from jose import JWTError, jwt
-from datetime import datetime, timedelta
+from cachetools import TTLCache
+import jwt
+import os
+import time
+import hashlib
+import orjson
+from datetime import datetime, timedelta, date, time as dt_time
 from pydantic import BaseModel
 from typing import Optional
+from contextlib import asynccontextmanager
 
 # ---------------- Config ----------------
-SECRET_KEY = "supersecretkey"
+SECRET_KEY = os.environ.get("SECRET_KEY")
+if not SECRET_KEY:
+    raise RuntimeError("SECRET_KEY environment variable must be set")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-DATABASE_URL = "sqlite:///./appointments.db"
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# plain sqlite:// and postgres(ql):// URLs (as hosting add-ons hand out) are mapped to the async drivers
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+}
+
+DATABASE_URL = make_url(os.environ.get("DATABASE_URL", "sqlite+aiosqlite:///./appointments.db"))
+DATABASE_URL = DATABASE_URL.set(drivername=ASYNC_DRIVERS.get(DATABASE_URL.drivername, DATABASE_URL.drivername))
+IS_SQLITE = DATABASE_URL.get_backend_name() == "sqlite"
+pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=10, deprecated="auto")
 
 # ---------------- Database Setup ----------------
 Base = declarative_base()
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_async_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    pool_size=20,
+    max_overflow=40,
+    pool_pre_ping=True,
+    pool_recycle=1800
+)
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+def set_sqlite_pragma(dbapi_conn, connection_record):
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-20000")
+    cursor.close()
+
+if IS_SQLITE:
+    event.listen(engine.sync_engine, "connect", set_sqlite_pragma)
 
 class User(Base):
     __tablename__ = "users"
@@ -39,14 +79,24 @@ class Appointment(Base):
     date = Column(Date, nullable=False)
     time = Column(Time, nullable=True)
     status = Column(String, default="pending")
-    patient_id = Column(Integer, ForeignKey("users.id"))
-    doctor_id = Column(Integer, ForeignKey("users.id"))
+    patient_id = Column(Integer, ForeignKey("users.id"), index=True)
+    doctor_id = Column(Integer, ForeignKey("users.id"), index=True)
 
     patient = relationship("User", foreign_keys=[patient_id])
     doctor = relationship("User", foreign_keys=[doctor_id])
 
 
-Base.metadata.create_all(bind=engine)
+def create_schema(connection):
+    # IF NOT EXISTS DDL rather than create_all's check-then-create, so workers starting
+    # together on a fresh database don't race; also backfills indexes on older databases
+    for table in Base.metadata.sorted_tables:
+        connection.execute(CreateTable(table, if_not_exists=True))
+        for index in table.indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
+
+async def init_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
 
 # ---------------- Auth Helpers ----------------
 def get_password_hash(password):
@@ -61,16 +111,26 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# token -> (User, exp), so repeat calls with the same token skip the JWT decode and user lookup
+user_cache = TTLCache(maxsize=10000, ttl=60)
+
+# the doctors list rarely changes; cleared whenever a doctor is created
+doctors_cache = TTLCache(maxsize=1, ttl=30)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    cached = user_cache.get(token)
+    if cached is not None:
+        user, exp = cached
+        if exp > time.time():
+            return user
+        # expired tokens fall through so jwt.decode rejects them
+        user_cache.pop(token, None)
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
@@ -81,13 +141,35 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-    except JWTError:
+    except jwt.PyJWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
     if user is None:
         raise credentials_exception
+    user_cache[token] = (user, payload["exp"])
     return user
 
+# ---------------- Response Helpers ----------------
+def etag_matches(if_none_match, etag):
+    # weak comparison: the header may list several tags, use *, or carry W/ added by proxies
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+def etag_response(request: Request, data):
+    body = orjson.dumps(data)
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
 # ---------------- Schemas ----------------
 
 
@@ -106,14 +188,20 @@ class UserLogin(BaseModel):
 
 class AppointmentCreate(BaseModel):
     doctor_id: int
-    date: str
+    date: date
 
 class AppointmentUpdate(BaseModel):
     status: str
-    time: str = None
+    time: Optional[dt_time] = None
 
 # ---------------- App Init ----------------
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    await init_doctor_suraj()
+    yield
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -125,18 +213,22 @@ app.add_middleware(
 
 # ---------------- Routes ----------------
 @app.post("/signup")
-def signup(user: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.email == user.email).first():
+async def signup(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    # one roundtrip for both the email uniqueness and single-doctor checks
+    row = (await db.execute(select(
+        exists().where(User.email == user.email).label("email_exists"),
+        exists().where(User.role == "doctor").label("doctor_exists")
+    ))).one()
+    if row.email_exists:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     if user.role == "doctor":
-        existing_doctor = db.query(User).filter(User.role == "doctor").first()
-        if existing_doctor:
+        if row.doctor_exists:
             raise HTTPException(status_code=400, detail="Only one doctor allowed")
         if user.name.strip().lower() != "suraj":
             raise HTTPException(status_code=400, detail="Only doctor named 'Suraj' is allowed")
 
-    hashed_pw = get_password_hash(user.password)
+    hashed_pw = await run_in_threadpool(get_password_hash, user.password)
     new_user = User(
         name=user.name,
         email=user.email,
@@ -146,92 +238,112 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
         fees=user.fees
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    if new_user.role == "doctor":
+        doctors_cache.clear()
     return {"message": "User created successfully"}
 
 @app.post("/login")
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if not db_user or not verify_password(user.password, db_user.password):
+async def login(user: UserLogin, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(User).where(User.email == user.email))
+    db_user = result.scalars().first()
+    if not db_user or not await run_in_threadpool(verify_password, user.password, db_user.password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     token = create_access_token({"sub": db_user.email, "role": db_user.role})
     return {"access_token": token, "token_type": "bearer", "role": db_user.role, "id": db_user.id}
 
 @app.get("/doctors")
-def get_doctors(db: Session = Depends(get_db)):
-    doctors = db.query(User).filter(User.role == "doctor").all()
+async def get_doctors(request: Request, db: AsyncSession = Depends(get_db)):
+    return etag_response(request, await list_doctors(db))
+
+async def list_doctors(db: AsyncSession):
+    doctors = doctors_cache.get("doctors")
+    if doctors is None:
+        rows = (await db.execute(
+            select(User.id, User.name, User.specialty, User.fees).where(User.role == "doctor")
+        )).all()
+        doctors = [{"id": r.id, "name": r.name, "specialty": r.specialty, "fees": r.fees} for r in rows]
+        doctors_cache["doctors"] = doctors
     return doctors
 
 @app.post("/appointments")
-def book_appointment(
+async def book_appointment(
     data: AppointmentCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "patient":
         raise HTTPException(status_code=403, detail="Only patients can book appointments")
 
-    try:
-        appointment_date = datetime.strptime(data.date, "%Y-%m-%d").date()
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
-
     new_appointment = Appointment(
         patient_id=current_user.id,
         doctor_id=data.doctor_id,
-        date=appointment_date,
+        date=data.date,
         status="pending"
     )
     db.add(new_appointment)
-    db.commit()
-    db.refresh(new_appointment)
+    await db.commit()
+    await db.refresh(new_appointment)
     return {"message": "Appointment booked!"}
 
 @app.get("/appointments")
-def get_appointments(
-    db: Session = Depends(get_db),
+async def get_appointments(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    return etag_response(request, await list_appointments(db, current_user))
+
+async def list_appointments(db: AsyncSession, current_user: User):
     result = []
     if current_user.role == "patient":
-        appts = db.query(Appointment).filter(Appointment.patient_id == current_user.id).all()
-        for appt in appts:
+        rows = (await db.execute(
+            select(Appointment.id, Appointment.doctor_id, User.name, Appointment.date, Appointment.status, Appointment.time)
+            .join(User, Appointment.doctor_id == User.id)
+            .where(Appointment.patient_id == current_user.id)
+        )).all()
+        for appt in rows:
             result.append({
                 "id": appt.id,
                 "doctor_id": appt.doctor_id,
-                "doctor_name": appt.doctor.name,
-                "date": appt.date.isoformat(),
+                "doctor_name": appt.name,
+                "date": appt.date,
                 "status": appt.status,
-                "time": appt.time.strftime("%H:%M:%S") if appt.time else None
+                "time": appt.time
             })
     elif current_user.role == "doctor":
-        appts = db.query(Appointment).filter(Appointment.doctor_id == current_user.id).all()
-        for appt in appts:
+        rows = (await db.execute(
+            select(Appointment.id, Appointment.patient_id, User.name, Appointment.date, Appointment.status, Appointment.time)
+            .join(User, Appointment.patient_id == User.id)
+            .where(Appointment.doctor_id == current_user.id)
+        )).all()
+        for appt in rows:
             result.append({
                 "id": appt.id,
                 "patient_id": appt.patient_id,
-                "patient_name": appt.patient.name,
-                "date": appt.date.isoformat(),
+                "patient_name": appt.name,
+                "date": appt.date,
                 "status": appt.status,
-                "time": appt.time.strftime("%H:%M:%S") if appt.time else None
+                "time": appt.time
             })
     return result
 
 @app.put("/appointments/{appointment_id}")
-def update_appointment(
+async def update_appointment(
     appointment_id: int, 
     appointment_update: AppointmentUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "doctor":
         raise HTTPException(status_code=403, detail="Only doctors can update status")
 
-    appt = db.query(Appointment).filter(
+    result = await db.execute(select(Appointment).where(
         Appointment.id == appointment_id,
         Appointment.doctor_id == current_user.id
-    ).first()
+    ))
+    appt = result.scalars().first()
 
     if not appt:
         raise HTTPException(status_code=404, detail="Appointment not found")
@@ -239,36 +351,53 @@ def update_appointment(
     appt.status = appointment_update.status
 
     if appointment_update.time:
-        try:
-            # Try parsing with seconds first
-            try:
-                appt.time = datetime.strptime(appointment_update.time, "%H:%M:%S").time()
-            except ValueError:
-                # If no seconds, parse HH:MM and add 0 seconds
-                appt.time = datetime.strptime(appointment_update.time, "%H:%M").time()
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid time format. Use HH:MM or HH:MM:SS")
-
-    db.commit()
-    db.refresh(appt)
+        # keep the HH:MM:SS precision the old strptime parsing allowed
+        appt.time = appointment_update.time.replace(microsecond=0)
+
+    await db.commit()
+    await db.refresh(appt)
     return {"message": "Appointment updated"}
 
+@app.get("/bootstrap")
+async def bootstrap(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return {
+        "me": {
+            "id": current_user.id,
+            "name": current_user.name,
+            "email": current_user.email,
+            "role": current_user.role,
+            "specialty": current_user.specialty,
+            "fees": current_user.fees
+        },
+        "doctors": await list_doctors(db) if current_user.role == "patient" else [],
+        "appointments": await list_appointments(db, current_user)
+    }
+
 
 # ---------------- Auto-create Doctor Suraj ----------------
-def init_doctor_suraj():
-    db = SessionLocal()
-    existing = db.query(User).filter(User.role == "doctor", User.name == "Suraj").first()
-    if not existing:
+async def init_doctor_suraj():
+    async with SessionLocal() as db:
+        existing = await db.scalar(
+            select(User.id).where(User.role == "doctor", User.name == "Suraj").limit(1)
+        )
+        if existing:
+            return
         suraj = User(
             name="Suraj",
             email="suraj@example.com",
-            password=get_password_hash("password123"),
+            password=await run_in_threadpool(get_password_hash, "password123"),
             role="doctor",
             specialty="General Physician",
             fees=500
         )
         db.add(suraj)
-        db.commit()
-    db.close()
-
-init_doctor_suraj()
+        try:
+            await db.commit()
+        except IntegrityError:
+            # another worker created Suraj between our check and insert
+            await db.rollback()
+            return
+        doctors_cache.clear()